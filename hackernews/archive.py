@@ -0,0 +1,163 @@
+import fcntl
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+from django.conf import settings
+
+# Every record in a segment is a (item id, payload length) header followed by the
+# zlib compressed json payload returned by the HackerNews API.
+RECORD_HEADER = struct.Struct(">QI")
+# Every entry in a segment index is an (item id, record offset) pair.
+INDEX_ENTRY = struct.Struct(">QQ")
+
+SEGMENT_SUFFIX = ".seg"
+INDEX_SUFFIX = ".idx"
+
+
+class ItemArchive:
+    """
+    Append-only archive of raw HackerNews API payloads, so items can be reprocessed
+    without fetching them again.
+
+    The archive is a directory of numbered segments, each one with an index file
+    mapping item ids to record offsets. A new segment is started once the current
+    one reaches `segment_size` bytes. The same item can be appended more than once,
+    in which case the latest payload wins.
+    """
+
+    def __init__(self, path, segment_size=64 * 1024 * 1024):
+        self.path = path
+        self.segment_size = segment_size
+        self._lock = threading.Lock()
+        self._index = None
+        self._segment = None
+
+    def _segment_path(self, segment, suffix):
+        return os.path.join(self.path, "{0:06d}{1}".format(segment, suffix))
+
+    def _segments(self):
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(
+            int(name[: -len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.path)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _load_index(self):
+        index = {}
+        for segment in self._segments():
+            with open(self._segment_path(segment, INDEX_SUFFIX), "rb") as index_file:
+                data = index_file.read()
+            # Ignore a trailing partial entry left by an interrupted append.
+            usable = len(data) - len(data) % INDEX_ENTRY.size
+            for item_id, offset in INDEX_ENTRY.iter_unpack(data[:usable]):
+                index[item_id] = (segment, offset)
+        return index
+
+    @property
+    def index(self):
+        """
+        Mapping of item id to the (segment, offset) of its latest archived payload.
+        """
+        if self._index is None:
+            self._index = self._load_index()
+        return self._index
+
+    def _current_segment(self):
+        if self._segment is None:
+            os.makedirs(self.path, exist_ok=True)
+            segments = self._segments()
+            self._segment = segments[-1] if segments else 1
+        return self._segment
+
+    def append(self, item_data):
+        """
+        Append the raw `item_data` returned by the HackerNews API to the archive.
+        Safe to call from several threads and processes sharing the archive directory.
+        """
+        item_id = int(item_data["id"])
+        payload = zlib.compress(json.dumps(item_data).encode("utf-8"))
+        record = RECORD_HEADER.pack(item_id, len(payload)) + payload
+
+        with self._lock:
+            while True:
+                segment = self._current_segment()
+                with open(
+                    self._segment_path(segment, SEGMENT_SUFFIX), "ab"
+                ) as segment_file:
+                    # The file lock serializes writers from other processes, and is
+                    # released when the file is closed.
+                    fcntl.flock(segment_file, fcntl.LOCK_EX)
+                    offset = segment_file.seek(0, os.SEEK_END)
+                    if offset >= self.segment_size:
+                        # Roll over, to the segment another process may have started already.
+                        self._segment = max(self._segments()[-1], segment + 1)
+                        continue
+                    segment_file.write(record)
+                    segment_file.flush()
+                    with open(
+                        self._segment_path(segment, INDEX_SUFFIX), "ab"
+                    ) as index_file:
+                        index_file.write(INDEX_ENTRY.pack(item_id, offset))
+                break
+
+            if self._index is not None:
+                self._index[item_id] = (segment, offset)
+
+    def get(self, item_id):
+        """
+        Return the latest archived payload of `item_id`, or None if it is not archived.
+        """
+        location = self.index.get(int(item_id))
+        if location is None:
+            return None
+        segment, offset = location
+        with open(self._segment_path(segment, SEGMENT_SUFFIX), "rb") as segment_file:
+            segment_file.seek(offset)
+            _, length = RECORD_HEADER.unpack(segment_file.read(RECORD_HEADER.size))
+            return json.loads(zlib.decompress(segment_file.read(length)))
+
+    def __iter__(self):
+        """
+        Yield the latest archived payload of every item, reading segments in order
+        through memory-mapped I/O.
+        """
+        offsets_by_segment = {}
+        for segment, offset in self.index.values():
+            offsets_by_segment.setdefault(segment, []).append(offset)
+
+        for segment in sorted(offsets_by_segment):
+            segment_path = self._segment_path(segment, SEGMENT_SUFFIX)
+            # Records are only read at indexed offsets, so a partial record left by an
+            # interrupted append (never indexed) does not affect the records after it.
+            with open(segment_path, "rb") as segment_file, mmap.mmap(
+                segment_file.fileno(), 0, access=mmap.ACCESS_READ
+            ) as data:
+                for offset in sorted(offsets_by_segment[segment]):
+                    _, length = RECORD_HEADER.unpack_from(data, offset)
+                    start = offset + RECORD_HEADER.size
+                    yield json.loads(zlib.decompress(data[start : start + length]))
+
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def get_item_archive():
+    """
+    Return the `ItemArchive` configured by `HN_ARCHIVE_DIR`, or None if archiving is disabled.
+    """
+    path = settings.HN_ARCHIVE_DIR
+    if not path:
+        return None
+    with _archives_lock:
+        if path not in _archives:
+            _archives[path] = ItemArchive(
+                path, segment_size=settings.HN_ARCHIVE_SEGMENT_SIZE
+            )
+        return _archives[path]
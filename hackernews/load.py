@@ -2,6 +2,7 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from enum import Enum
 import json
+import threading
 
 from django.conf import settings
 from django.db import transaction
@@ -11,7 +12,8 @@ from django.views.decorators.http import require_http_methods
 import pytz
 import requests
 
-from hackernews.models import Item
+from hackernews.archive import get_item_archive
+from hackernews.models import Item, UserStats
 
 
 class ItemsType(Enum):
@@ -23,9 +25,10 @@ class ItemsType(Enum):
 def get_item_from_hackernews(item_id):
     try:
         api_response = requests.get(
-            settings.HN_API_URL + "item/{0}.json".format(item_id)
+            settings.HN_API_URL + "item/{0}.json".format(item_id),
+            timeout=settings.HN_API_TIMEOUT,
         )
-    except requests.exceptions.SSLError:
+    except requests.exceptions.RequestException:
         return
 
     if api_response.ok:
@@ -33,6 +36,96 @@ def get_item_from_hackernews(item_id):
         return item_data
 
 
+# Upstream requests currently in flight, keyed by item id, so that concurrent
+# callers asking for the same missing item share a single HackerNews call.
+_inflight_lock = threading.Lock()
+_inflight_requests = {}
+
+
+def _forget_inflight_request(item_id, future):
+    with _inflight_lock:
+        if _inflight_requests.get(item_id) is future:
+            del _inflight_requests[item_id]
+
+
+def get_item_from_hackernews_coalesced(executor, item_id):
+    """
+    Return a future resolving to the HackerNews data of `item_id`, reusing the
+    request already in flight for that id if there is one.
+    """
+    with _inflight_lock:
+        future = _inflight_requests.get(item_id)
+        if future is not None:
+            return future
+        future = executor.submit(get_item_from_hackernews, item_id)
+        _inflight_requests[item_id] = future
+    future.add_done_callback(lambda f: _forget_inflight_request(item_id, f))
+    return future
+
+
+def is_storable_item(item_data):
+    """
+    Return whether `item_data`, as returned by the HackerNews API, can be saved as an `Item`:
+    deleted and dead items, or items without an author, are not.
+    """
+    return bool(
+        item_data
+        and not item_data.get("deleted")
+        and not item_data.get("dead")
+        and item_data.get("by")
+    )
+
+
+def item_fields(item_data):
+    """
+    Map `item_data`, as returned by the HackerNews API, to `Item` field values.
+    """
+    return {
+        "author": item_data["by"],
+        "time": datetime.fromtimestamp(item_data["time"], pytz.timezone("UTC")),
+        "score": item_data.get("score", 0),
+        "title": item_data.get("title", ""),
+        "url": item_data.get("url", ""),
+        "type": item_data["type"],
+    }
+
+
+def save_item(item_data):
+    """
+    Update or create the `Item` described by `item_data`, as returned by the HackerNews API.
+    """
+    obj, created = Item.objects.update_or_create(
+        id=int(item_data["id"]), defaults=item_fields(item_data)
+    )
+    return obj
+
+
+def fetch_items_from_hackernews(items_ids):
+    """
+    Fetch `items_ids` concurrently from the HackerNews API, save them to the database
+    and return the saved `Item`s. Ids unknown to HackerNews, failing to fetch or that
+    can't be stored (see `is_storable_item`) are skipped.
+    """
+    with ThreadPoolExecutor(max_workers=100) as executor:
+        processes = [
+            get_item_from_hackernews_coalesced(executor, item_id)
+            for item_id in items_ids
+        ]
+
+    archive = get_item_archive()
+    saved_items = []
+    with transaction.atomic():
+        for task in processes:
+            item_data = task.result()
+            if not is_storable_item(item_data):
+                continue
+            if archive:
+                archive.append(item_data)
+            saved_items.append(save_item(item_data))
+        UserStats.refresh(item.author for item in saved_items)
+    return saved_items
+
+
 @require_http_methods(["POST"])
 def load_items_from_hackernews(request: HttpRequest) -> HttpResponseBase:
     """
@@ -66,7 +159,8 @@ def load_items_from_hackernews(request: HttpRequest) -> HttpResponseBase:
         return JsonResponse(data={"message": "invalid limit."}, status=400)
 
     api_response = requests.get(
-        settings.HN_API_URL + "{0}stories.json".format(data["type"])
+        settings.HN_API_URL + "{0}stories.json".format(data["type"]),
+        timeout=settings.HN_API_TIMEOUT,
     )
 
     if api_response.ok:
@@ -80,26 +174,20 @@ def load_items_from_hackernews(request: HttpRequest) -> HttpResponseBase:
             for item_id in items_ids:
                 processes.append(executor.submit(get_item_from_hackernews, item_id))
 
-        # Update or create all items in one db commit.
+        # Update or create all items and their authors stats in one db commit,
+        # archiving the raw payloads if enabled.
+        archive = get_item_archive()
         saved_count = 0
+        authors = set()
         with transaction.atomic():
             for task in as_completed(processes):
                 item_data = task.result()
-                if not item_data:
+                if not is_storable_item(item_data):
                     continue
-                obj, created = Item.objects.update_or_create(
-                    id=item_data["id"],
-                    defaults={
-                        "author": item_data["by"],
-                        "time": datetime.fromtimestamp(
-                            item_data["time"], pytz.timezone("UTC")
-                        ),
-                        "score": item_data.get("score", ""),
-                        "title": item_data.get("title", ""),
-                        "url": item_data.get("url", ""),
-                        "type": item_data["type"],
-                    },
-                )
+                if archive:
+                    archive.append(item_data)
+                authors.add(save_item(item_data).author)
                 saved_count += 1
+            UserStats.refresh(authors)
 
     return JsonResponse(data={"saved": saved_count}, status=200)
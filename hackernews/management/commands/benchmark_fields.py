@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the payload size and latency of item list pages with all fields "
+        "against pages restricted with the `fields` query parameter. "
+        "Only reads from the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit", type=int, default=1000, help="number of items per page"
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="number of requests per variant"
+        )
+        parser.add_argument(
+            "--fields",
+            action="append",
+            default=None,
+            help="fields variant to compare with all fields, can be repeated (default: id,score)",
+        )
+
+    def handle(self, *args, **options):
+        client = Client()
+        variants = [None] + (options["fields"] or ["id,score"])
+
+        self.stdout.write(f"{'fields':<30}{'bytes':>12}{'ms/request':>14}")
+        for fields in variants:
+            url = f"/hackernews/items?limit={options['limit']}"
+            if fields:
+                url += f"&fields={fields}"
+
+            client.get(url)  # warm up
+            start = time.perf_counter()
+            for _ in range(options["repeat"]):
+                response = client.get(url)
+            elapsed_ms = (time.perf_counter() - start) * 1000 / options["repeat"]
+
+            self.stdout.write(
+                f"{fields or 'all':<30}{len(response.content):>12}{elapsed_ms:>14.2f}"
+            )
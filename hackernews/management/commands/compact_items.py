@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from hackernews.models import ITEM_FIELDS, ColdItem, Item
+
+
+class Command(BaseCommand):
+    help = (
+        "Move items older than the retention policy out of the `Item` table "
+        "into the `ColdItem` table, in small batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            help="move items older than this many days (defaults to HN_ITEMS_RETENTION_DAYS)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="number of items moved per database transaction",
+        )
+
+    def handle(self, *args, **options):
+        days = options["days"]
+        if days is None:
+            days = settings.HN_ITEMS_RETENTION_DAYS
+        if days is None:
+            raise CommandError(
+                "no retention policy configured, set HN_ITEMS_RETENTION_DAYS or pass --days."
+            )
+
+        cutoff = timezone.now() - timedelta(days=days)
+        moved_count = 0
+        while True:
+            moved = self._move_batch(cutoff, options["batch_size"])
+            if not moved:
+                break
+            moved_count += moved
+
+        self.stdout.write(f"moved {moved_count} items to the cold tier.")
+
+    def _move_batch(self, cutoff, batch_size):
+        # Each batch is its own short transaction so loads are never blocked for long.
+        with transaction.atomic():
+            batch = list(
+                Item.objects.select_for_update()
+                .filter(time__lt=cutoff)
+                .order_by("id")[:batch_size]
+            )
+            if not batch:
+                return 0
+            ids = [i.id for i in batch]
+            # An item reloaded after being moved replaces its previous cold copy.
+            ColdItem.objects.filter(id__in=ids).delete()
+            ColdItem.objects.bulk_create(
+                ColdItem(id=i.id, **{f: getattr(i, f) for f in ITEM_FIELDS})
+                for i in batch
+            )
+            Item.objects.filter(id__in=ids).delete()
+        return len(batch)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from hackernews.models import UserStats
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the `UserStats` table from the items in both tiers, e.g. after "
+        "loading items with `loaddata`."
+    )
+
+    def handle(self, *args, **options):
+        UserStats.rebuild()
+        self.stdout.write(f"rebuilt stats of {UserStats.objects.count()} users.")
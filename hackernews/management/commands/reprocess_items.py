@@ -0,0 +1,88 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from hackernews.archive import ItemArchive, get_item_archive
+from hackernews.load import is_storable_item, item_fields
+from hackernews.models import ITEM_FIELDS, ColdItem, Item, UserStats
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild `Item` rows from the raw HackerNews payloads archive, "
+        "without fetching them again from the HackerNews API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--archive-dir",
+            help="archive directory to read from (defaults to HN_ARCHIVE_DIR)",
+        )
+        parser.add_argument(
+            "--only-missing",
+            action="store_true",
+            help="only create items that are not in the database, leaving existing ones untouched",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="number of items written per database transaction",
+        )
+
+    def handle(self, *args, **options):
+        if options["archive_dir"]:
+            archive = ItemArchive(options["archive_dir"])
+        else:
+            archive = get_item_archive()
+        if archive is None:
+            raise CommandError(
+                "no archive configured, set HN_ARCHIVE_DIR or pass --archive-dir."
+            )
+
+        created_count = updated_count = 0
+        batch = []
+        for item_data in archive:
+            if not is_storable_item(item_data):
+                continue
+            batch.append(Item(id=int(item_data["id"]), **item_fields(item_data)))
+            if len(batch) < options["batch_size"]:
+                continue
+            created, updated = self._save_batch(batch, options["only_missing"])
+            created_count += created
+            updated_count += updated
+            batch = []
+        if batch:
+            created, updated = self._save_batch(batch, options["only_missing"])
+            created_count += created
+            updated_count += updated
+
+        self.stdout.write(
+            f"created {created_count} items, updated {updated_count} items."
+        )
+
+    def _save_batch(self, batch, only_missing):
+        ids = [i.id for i in batch]
+        existing_ids = set(Item.objects.filter(id__in=ids).values_list("id", flat=True))
+        # Items moved to the cold tier by `compact_items` are rebuilt there, so they
+        # don't come back into the hot tier.
+        cold_ids = set(ColdItem.objects.filter(id__in=ids).values_list("id", flat=True))
+        to_create = [i for i in batch if i.id not in existing_ids | cold_ids]
+        to_update = [] if only_missing else [i for i in batch if i.id in existing_ids]
+        to_update_cold = (
+            []
+            if only_missing
+            else [
+                ColdItem(id=i.id, **{f: getattr(i, f) for f in ITEM_FIELDS})
+                for i in batch
+                if i.id in cold_ids and i.id not in existing_ids
+            ]
+        )
+
+        with transaction.atomic():
+            Item.objects.bulk_create(to_create)
+            if to_update:
+                Item.objects.bulk_update(to_update, ITEM_FIELDS)
+            if to_update_cold:
+                ColdItem.objects.bulk_update(to_update_cold, ITEM_FIELDS)
+            UserStats.refresh(i.author for i in to_create + to_update + to_update_cold)
+        return len(to_create), len(to_update) + len(to_update_cold)
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.4 on 2026-10-18 22:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hackernews", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ColdItem",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("author", models.CharField(max_length=1024)),
+                ("time", models.DateTimeField(db_index=True)),
+                ("score", models.IntegerField()),
+                ("title", models.CharField(max_length=1024)),
+                ("url", models.CharField(max_length=1024)),
+                ("type", models.CharField(max_length=1024)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.AlterField(
+            model_name="item",
+            name="time",
+            field=models.DateTimeField(db_index=True),
+        ),
+    ]
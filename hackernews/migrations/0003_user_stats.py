@@ -0,0 +1,73 @@
+# Generated by Django 3.2.4 on 2026-10-18 22:03
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_user_stats(apps, schema_editor):
+    Item = apps.get_model("hackernews", "Item")
+    ColdItem = apps.get_model("hackernews", "ColdItem")
+    UserStats = apps.get_model("hackernews", "UserStats")
+    stats = {}
+    for items in [
+        Item.objects.all(),
+        ColdItem.objects.exclude(id__in=Item.objects.values("id")),
+    ]:
+        for user_stats in (
+            items.values("author")
+            .annotate(item_count=Count("id"), score=Sum("score"))
+            .order_by()
+            .iterator()
+        ):
+            item_count, score = stats.get(user_stats["author"], (0, 0))
+            stats[user_stats["author"]] = (
+                item_count + user_stats["item_count"],
+                score + user_stats["score"],
+            )
+    UserStats.objects.bulk_create(
+        (
+            UserStats(name=name, item_count=item_count, score=score)
+            for name, (item_count, score) in stats.items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hackernews", "0002_cold_items"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserStats",
+            fields=[
+                (
+                    "name",
+                    models.CharField(
+                        max_length=1024, primary_key=True, serialize=False
+                    ),
+                ),
+                ("item_count", models.IntegerField()),
+                ("score", models.IntegerField()),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="colditem",
+            name="author",
+            field=models.CharField(db_index=True, max_length=1024),
+        ),
+        migrations.AlterField(
+            model_name="item",
+            name="author",
+            field=models.CharField(db_index=True, max_length=1024),
+        ),
+        migrations.AddIndex(
+            model_name="userstats",
+            index=models.Index(
+                fields=["-score", "name"], name="hackernews__score_ae1b3b_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_user_stats, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,11 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, Sum
 
+# Item fields other than the primary key, i.e. the ones copied between item tiers.
+ITEM_FIELDS = ["author", "time", "score", "title", "url", "type"]
 
-class Item(models.Model):
+
+class BaseItem(models.Model):
     """
     A model representing a HackerNews item.
     The primary key should be set to the id of the item in the HackerNews API.
@@ -14,9 +18,120 @@ class Item(models.Model):
         ("job", "story", "comment", "poll", or "pollopt"), and will generally be "story".
     """
 
-    author = models.CharField(max_length=1024)
-    time = models.DateTimeField()
+    author = models.CharField(max_length=1024, db_index=True)
+    time = models.DateTimeField(db_index=True)
     score = models.IntegerField()
     title = models.CharField(max_length=1024)
     url = models.CharField(max_length=1024)
     type = models.CharField(max_length=1024)
+
+    class Meta:
+        abstract = True
+
+
+class Item(BaseItem):
+    """
+    A HackerNews item in the hot tier, the one every endpoint reads from.
+    """
+
+
+class ColdItem(BaseItem):
+    """
+    A HackerNews item moved out of the hot tier by the `compact_items` command,
+    once it is older than the retention policy.
+    """
+
+
+class UserStats(models.Model):
+    """
+    Aggregated stats of the items authored by a HackerNews user, in both the `Item`
+    and `ColdItem` tiers, so that per-user and ranking queries don't have to aggregate
+    the items tables.
+    The load, fetch and reprocess code paths refresh the stats of the authors they write;
+    items written any other way (e.g. `loaddata`) need a `rebuild_user_stats`.
+    The `score` field is the summed score of all the user's items.
+    A user's rank is 1 + the number of users with a higher score.
+    """
+
+    name = models.CharField(max_length=1024, primary_key=True)
+    item_count = models.IntegerField()
+    score = models.IntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=["-score", "name"])]
+
+    @classmethod
+    def aggregate(cls, authors=None):
+        """
+        Return a mapping of author to (item_count, score) over their items in both tiers,
+        for `authors` or all of them. An item in both tiers, reloaded after being
+        compacted, is counted once.
+        """
+        hot_items = Item.objects.all()
+        cold_items = ColdItem.objects.all()
+        if authors is not None:
+            hot_items = hot_items.filter(author__in=authors)
+            cold_items = cold_items.filter(author__in=authors)
+        cold_items = cold_items.exclude(id__in=hot_items.values("id"))
+
+        stats = {}
+        for items in [hot_items, cold_items]:
+            for user_stats in (
+                items.values("author")
+                .annotate(item_count=Count("id"), score=Sum("score"))
+                .order_by()
+            ):
+                item_count, score = stats.get(user_stats["author"], (0, 0))
+                stats[user_stats["author"]] = (
+                    item_count + user_stats["item_count"],
+                    score + user_stats["score"],
+                )
+        return stats
+
+    @classmethod
+    def refresh(cls, authors):
+        """
+        Recompute the stats of `authors` from their items, removing users with no items left.
+        Meant to be called at the end of the transaction writing the items.
+        """
+        authors = sorted(set(authors))
+        if not authors:
+            return
+        with transaction.atomic():
+            # Lock the authors rows (in a consistent order to avoid deadlocks) before
+            # aggregating, so a concurrent transaction writing items of the same authors
+            # waits for this one to commit and then aggregates its items too.
+            cls.objects.bulk_create(
+                [cls(name=name, item_count=0, score=0) for name in authors],
+                ignore_conflicts=True,
+            )
+            list(
+                cls.objects.select_for_update()
+                .filter(name__in=authors)
+                .order_by("name")
+                .values_list("name", flat=True)
+            )
+
+            stats = cls.aggregate(authors)
+            for name, (item_count, score) in stats.items():
+                cls.objects.filter(name=name).update(item_count=item_count, score=score)
+            cls.objects.filter(name__in=set(authors) - stats.keys()).delete()
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recompute the stats of every user from scratch.
+        """
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(
+                (
+                    cls(name=name, item_count=item_count, score=score)
+                    for name, (item_count, score) in cls.aggregate().items()
+                ),
+                batch_size=1000,
+            )
+
+    @property
+    def rank(self):
+        return UserStats.objects.filter(score__gt=self.score).count() + 1
@@ -0,0 +1,150 @@
+from io import StringIO
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+
+from hackernews.archive import RECORD_HEADER, ItemArchive
+from hackernews.models import ColdItem, Item
+from hackernews.tests.test_load import mock_requests_get
+
+
+def item_data(item_id, score=10):
+    return {
+        "id": item_id,
+        "by": f"user{item_id}",
+        "score": score,
+        "time": 1175714200,
+        "title": f"title {item_id}",
+        "type": "story",
+        "url": f"https://cool_story.com/{item_id}",
+        "descendants": 3,
+    }
+
+
+class ItemArchiveTests(TestCase):
+    """
+    Tests of the raw HackerNews payloads archive.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def test_append_and_get(self):
+        """
+        Test that archived payloads are returned untouched, latest version first
+        """
+        archive = ItemArchive(self.tmp_dir.name)
+        archive.append(item_data(1))
+        archive.append(item_data(2))
+        archive.append(item_data(1, score=20))
+        self.assertEqual(archive.get(1), item_data(1, score=20))
+        self.assertEqual(archive.get(2), item_data(2))
+        self.assertIsNone(archive.get(3))
+        # a fresh instance rebuilds the index from disk
+        self.assertEqual(ItemArchive(self.tmp_dir.name).get(1)["score"], 20)
+
+    def test_iterate_segments(self):
+        """
+        Test that iterating rolls over segments and yields only the latest payload of each item
+        """
+        archive = ItemArchive(self.tmp_dir.name, segment_size=1)
+        for item_id in range(1, 6):
+            archive.append(item_data(item_id))
+        archive.append(item_data(3, score=30))
+        segments = [n for n in os.listdir(self.tmp_dir.name) if n.endswith(".seg")]
+        self.assertEqual(len(segments), 6)
+        items = list(ItemArchive(self.tmp_dir.name))
+        self.assertEqual([i["id"] for i in items], [1, 2, 4, 5, 3])
+        self.assertEqual(items[-1]["score"], 30)
+
+    def test_concurrent_writers(self):
+        """
+        Test that archives sharing a directory, as different processes would, append
+        whole records to the latest segment and roll over consistently
+        """
+        first = ItemArchive(self.tmp_dir.name, segment_size=200)
+        second = ItemArchive(self.tmp_dir.name, segment_size=200)
+        for item_id in range(1, 21):
+            (first if item_id % 2 else second).append(item_data(item_id))
+        archive = ItemArchive(self.tmp_dir.name)
+        self.assertEqual([i["id"] for i in archive], list(range(1, 21)))
+        self.assertEqual(archive.get(7), item_data(7))
+        segments = [n for n in os.listdir(self.tmp_dir.name) if n.endswith(".seg")]
+        self.assertGreater(len(segments), 1)
+
+    def test_iterate_after_interrupted_append(self):
+        """
+        Test that a partial record left by an interrupted append does not hide
+        the records appended after it
+        """
+        archive = ItemArchive(self.tmp_dir.name)
+        archive.append(item_data(1))
+        with open(os.path.join(self.tmp_dir.name, "000001.seg"), "ab") as segment:
+            segment.write(RECORD_HEADER.pack(2, 100) + b"partial")
+        for item_id in range(3, 40):
+            archive.append(item_data(item_id))
+        items = list(ItemArchive(self.tmp_dir.name))
+        self.assertEqual([i["id"] for i in items], [1] + list(range(3, 40)))
+
+
+@patch("hackernews.load.requests.get", side_effect=mock_requests_get)
+class ReprocessItemsTests(TestCase):
+    """
+    Tests of archiving items on load and rebuilding them with `reprocess_items`.
+    """
+
+    test_client = Client()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def test_load_and_reprocess(self, requests_get_mock):
+        """
+        Test that loaded items are archived and can be rebuilt without calling HackerNews
+        """
+        with override_settings(HN_ARCHIVE_DIR=self.tmp_dir.name):
+            self.test_client.post(
+                "/hackernews/load", {"type": "top"}, content_type="application/json"
+            )
+            Item.objects.filter(id=1).delete()
+            Item.objects.filter(id=2).update(score=0)
+            requests_get_mock.reset_mock()
+
+            call_command("reprocess_items", "--only-missing", stdout=StringIO())
+            self.assertEqual(Item.objects.get(id=1).score, 10)
+            self.assertEqual(Item.objects.get(id=2).score, 0)
+
+            call_command("reprocess_items", stdout=StringIO())
+            self.assertEqual(Item.objects.get(id=2).score, 20)
+            self.assertEqual(
+                sorted(Item.objects.values_list("id", flat=True)), [1, 2, 3]
+            )
+        requests_get_mock.assert_not_called()
+
+    def test_reprocess_keeps_cold_items_cold(self, requests_get_mock):
+        """
+        Test that reprocessing rebuilds compacted items in the cold tier instead of
+        bringing them back into the hot tier
+        """
+        with override_settings(HN_ARCHIVE_DIR=self.tmp_dir.name):
+            self.test_client.post(
+                "/hackernews/load", {"type": "top"}, content_type="application/json"
+            )
+            call_command("compact_items", "--days", "1", stdout=StringIO())
+            ColdItem.objects.filter(id=2).update(score=0)
+
+            call_command("reprocess_items", "--only-missing", stdout=StringIO())
+            self.assertFalse(Item.objects.exists())
+            self.assertEqual(ColdItem.objects.get(id=2).score, 0)
+
+            call_command("reprocess_items", stdout=StringIO())
+            self.assertFalse(Item.objects.exists())
+            self.assertEqual(ColdItem.objects.get(id=2).score, 20)
+            self.assertEqual(
+                sorted(ColdItem.objects.values_list("id", flat=True)), [1, 2, 3]
+            )
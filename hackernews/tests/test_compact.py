@@ -0,0 +1,141 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, Client, override_settings
+from django.utils import timezone
+
+from hackernews.models import ColdItem, Item, UserStats
+
+
+class CompactItemsTests(TestCase):
+    """
+    Tests of moving old items to the cold tier with `compact_items`, and of reading
+    them back through the item endpoints.
+    """
+
+    fixtures = ["items.json"]
+    test_client = Client()
+
+    def test_compact_old_items(self):
+        """
+        Test that items older than the retention policy are moved in batches,
+        and recent items are kept in the hot tier
+        """
+        Item.objects.filter(id=4).update(time=timezone.now() - timedelta(days=1))
+        UserStats.refresh(["abc", "cba"])
+        call_command(
+            "compact_items", "--days", "7", "--batch-size", "2", stdout=StringIO()
+        )
+        self.assertEqual(list(Item.objects.values_list("id", flat=True)), [4])
+        self.assertEqual(
+            sorted(ColdItem.objects.values_list("id", flat=True)), [1, 2, 3]
+        )
+        cold_item = ColdItem.objects.get(id=1)
+        self.assertEqual(cold_item.author, "abc")
+        self.assertEqual(cold_item.score, 200)
+        # user stats account for items in both tiers, so compacting doesn't change them
+        self.assertEqual(
+            list(
+                UserStats.objects.order_by("name").values_list(
+                    "name", "item_count", "score"
+                )
+            ),
+            [("abc", 3, 450), ("cba", 1, 300)],
+        )
+        response = self.test_client.get("/hackernews/users/abc")
+        self.assertEqual(
+            response.json(), {"name": "abc", "item_count": 3, "score": 450, "rank": 1}
+        )
+        # and reloading a compacted item doesn't count it twice
+        Item.objects.create(
+            id=1, author="abc", score=250, time=timezone.now(), type="story"
+        )
+        UserStats.refresh(["abc"])
+        self.assertEqual(
+            UserStats.objects.values_list("item_count", "score").get(name="abc"),
+            (3, 500),
+        )
+
+    @override_settings(HN_ITEMS_RETENTION_DAYS=None)
+    def test_compact_without_retention_policy(self):
+        """
+        Test that compacting fails if no retention policy is configured or passed
+        """
+        with self.assertRaises(CommandError):
+            call_command("compact_items", stdout=StringIO())
+        self.assertEqual(Item.objects.count(), 4)
+
+    @override_settings(HN_ITEMS_RETENTION_DAYS=7)
+    def test_read_through_cold_tier(self):
+        """
+        Test that compacted items are only returned when asking for the cold tier
+        """
+        call_command("compact_items", stdout=StringIO())
+
+        response = self.test_client.get("/hackernews/item/1")
+        self.assertEquals(response.status_code, 404)
+        response = self.test_client.get("/hackernews/item/1?include_cold=1")
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(response.json()["title"], "A good post")
+
+        response = self.test_client.get("/hackernews/items?ids=2,1,123")
+        self.assertEqual(response.json()["missing"], [2, 1, 123])
+        response = self.test_client.get("/hackernews/items?ids=2,1,123&include_cold=1")
+        response_json = response.json()
+        self.assertEqual([i["id"] for i in response_json["items"]], [2, 1])
+        self.assertEqual(response_json["missing"], [123])
+
+        response = self.test_client.get("/hackernews/items?limit=2")
+        self.assertEqual(response.json()["items"], [])
+        # a compacted item reloaded into the hot tier is listed once, from the hot tier
+        Item.objects.create(
+            id=1, author="abc", score=1, time=timezone.now(), type="story"
+        )
+        items = []
+        next_page = 1
+        while next_page:
+            response = self.test_client.get(
+                f"/hackernews/items?limit=2&page={next_page}&include_cold=1&fields=score"
+            )
+            self.assertEquals(response.status_code, 200)
+            items.extend(response.json()["items"])
+            next_page = response.json()["next_page"]
+        self.assertEqual([i["score"] for i in items], [1, 300, 100, 150])
+
+    @override_settings(HN_ITEMS_RETENTION_DAYS=7)
+    def test_read_empty_hot_tier(self):
+        """
+        Test that lists without a limit still work once every item has been compacted
+        """
+        call_command("compact_items", stdout=StringIO())
+        for url in ["/hackernews/items", "/hackernews/users"]:
+            response = self.test_client.get(url)
+            self.assertEquals(response.status_code, 200)
+            self.assertEquals(response.json()["next_page"], None)
+        response = self.test_client.get("/hackernews/items?include_cold=1")
+        self.assertEqual([i["id"] for i in response.json()["items"]], [1, 2, 3, 4])
+
+    @override_settings(HN_ITEMS_RETENTION_DAYS=7)
+    def test_user_orderings_agree_after_compaction(self):
+        """
+        Test that users listed by name and by score report the same stats after compacting
+        """
+        call_command("rebuild_user_stats", stdout=StringIO())
+        call_command("compact_items", stdout=StringIO())
+        by_name = self.test_client.get("/hackernews/users").json()["users"]
+        by_score = self.test_client.get("/hackernews/users?order=-score").json()[
+            "users"
+        ]
+        self.assertEqual(
+            by_name,
+            [
+                {"name": "abc", "item_count": 3, "score": 450},
+                {"name": "cba", "item_count": 1, "score": 300},
+            ],
+        )
+        self.assertEqual(
+            {u["name"]: (u["item_count"], u["score"]) for u in by_score},
+            {u["name"]: (u["item_count"], u["score"]) for u in by_name},
+        )
@@ -1,10 +1,14 @@
+from concurrent.futures import ThreadPoolExecutor
 import json
 import re
+import threading
 from unittest.mock import patch
 
 from django.test import TestCase, Client
+import requests
 
-from hackernews.models import Item
+from hackernews.load import get_item_from_hackernews_coalesced
+from hackernews.models import Item, UserStats
 
 
 def mock_requests_get(*args, **kwargs):
@@ -28,6 +32,19 @@ def mock_requests_get(*args, **kwargs):
         return MockResponse(200, [3, 4, 5, 6])
     elif url.endswith("newstories.json"):
         return MockResponse(200, [0, 7, 8, 9])
+    elif url.endswith("/10.json"):
+        # comments have no score, title nor url
+        return MockResponse(
+            200,
+            {"id": 10, "by": "user10", "time": 1175714200, "type": "comment"},
+        )
+    elif url.endswith("/11.json"):
+        # deleted items have no author
+        return MockResponse(
+            200, {"id": 11, "deleted": True, "time": 1175714200, "type": "story"}
+        )
+    elif url.endswith("/12.json"):
+        raise requests.exceptions.ConnectionError()
     # only matches items 1-9, item 0 will 404
     elif match := re.match(".*/([1-9])\\.json$", url):
         story_id = match.group(1)
@@ -126,3 +143,113 @@ class LoadTests(TestCase):
         in_db = Item.objects.all()
         self.assertEquals(len(in_db), 6)
         self.assertEquals(sorted([i.id for i in in_db]), [1, 2, 3, 4, 5, 6])
+
+    def test_load_updates_user_stats(self, requests_get_mock):
+        """
+        Test that loading items keeps their authors stats up to date
+        """
+        self.test_client.post(
+            "/hackernews/load", {"type": "top"}, content_type="application/json"
+        )
+        self.assertEqual(
+            list(UserStats.objects.order_by("-score").values_list("name", "score")),
+            [("user3", 30), ("user2", 20), ("user1", 10)],
+        )
+
+
+@patch("hackernews.load.requests.get", side_effect=mock_requests_get)
+class FetchMissingItemsTests(TestCase):
+    """
+    Tests of the read-through fetch of items missing from the database.
+    """
+
+    fixtures = ["items.json"]
+    test_client = Client()
+
+    def test_items_by_ids_fetch_missing(self, requests_get_mock):
+        """
+        Test that an ids lookup with fetch_missing saves and returns items 5 and 6,
+        only calls HackerNews for missing ids, and still reports item 0 as missing
+        """
+        response = self.test_client.get("/hackernews/items?ids=1,5,0,6&fetch_missing=1")
+        self.assertEquals(response.status_code, 200)
+        response_json = response.json()
+        self.assertEqual([i["id"] for i in response_json["items"]], [1, 5, 6])
+        self.assertEqual(response_json["missing"], [0])
+        self.assertEqual(requests_get_mock.call_count, 3)
+        self.assertEqual(Item.objects.filter(id__in=[5, 6]).count(), 2)
+
+    def test_items_by_ids_fetch_missing_comment(self, requests_get_mock):
+        """
+        Test that fetching a comment, which has no score, saves it with a score of 0
+        """
+        response = self.test_client.get("/hackernews/items?ids=10&fetch_missing=1")
+        self.assertEquals(response.status_code, 200)
+        response_json = response.json()
+        self.assertEqual(response_json["items"][0]["type"], "comment")
+        self.assertEqual(response_json["items"][0]["score"], 0)
+        self.assertEqual(Item.objects.get(id=10).score, 0)
+
+    def test_items_by_ids_fetch_missing_deleted(self, requests_get_mock):
+        """
+        Test that a deleted item is reported as missing without failing the other ids
+        """
+        response = self.test_client.get("/hackernews/items?ids=5,11&fetch_missing=1")
+        self.assertEquals(response.status_code, 200)
+        response_json = response.json()
+        self.assertEqual([i["id"] for i in response_json["items"]], [5])
+        self.assertEqual(response_json["missing"], [11])
+        self.assertFalse(Item.objects.filter(id=11).exists())
+
+    def test_items_by_ids_fetch_missing_upstream_error(self, requests_get_mock):
+        """
+        Test that an item failing to fetch is reported as missing without failing the
+        other ids, and that HackerNews is called with a timeout
+        """
+        response = self.test_client.get("/hackernews/items?ids=5,12&fetch_missing=1")
+        self.assertEquals(response.status_code, 200)
+        response_json = response.json()
+        self.assertEqual([i["id"] for i in response_json["items"]], [5])
+        self.assertEqual(response_json["missing"], [12])
+        for call in requests_get_mock.call_args_list:
+            self.assertIn("timeout", call.kwargs)
+
+    def test_items_by_ids_without_fetch_missing(self, requests_get_mock):
+        """
+        Test that an ids lookup without fetch_missing does not call HackerNews
+        """
+        response = self.test_client.get("/hackernews/items?ids=1,5")
+        self.assertEqual(response.json()["missing"], [5])
+        requests_get_mock.assert_not_called()
+
+
+class CoalescedFetchTests(TestCase):
+    """
+    Tests of the single-flight coalescing of HackerNews item requests.
+    """
+
+    def test_concurrent_requests_share_upstream_call(self):
+        """
+        Test that concurrent fetches of the same item make a single upstream call
+        """
+        release = threading.Event()
+
+        def slow_get_item(item_id):
+            release.wait(5)
+            return {"id": item_id}
+
+        with patch(
+            "hackernews.load.get_item_from_hackernews", side_effect=slow_get_item
+        ) as get_item_mock:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                first = get_item_from_hackernews_coalesced(executor, 42)
+                second = get_item_from_hackernews_coalesced(executor, 42)
+                release.set()
+            self.assertIs(first, second)
+            self.assertEqual(second.result(), {"id": 42})
+            self.assertEqual(get_item_mock.call_count, 1)
+
+            # Once finished, the next request goes upstream again.
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                get_item_from_hackernews_coalesced(executor, 42).result()
+            self.assertEqual(get_item_mock.call_count, 2)
@@ -1,4 +1,11 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+
+from hackernews.models import Item, UserStats
 
 
 class ViewTests(TestCase):
@@ -10,6 +17,10 @@ class ViewTests(TestCase):
     fixtures = ["items.json"]
     test_client = Client()
 
+    def setUp(self):
+        # fixtures are loaded with `loaddata`, which doesn't maintain user stats
+        call_command("rebuild_user_stats", stdout=StringIO())
+
     def test_index(self):
         """
         Test that the index redirects to the items endpoint
@@ -99,3 +110,154 @@ class ViewTests(TestCase):
         cba_user = [u for u in json if u["name"] == "cba"][0]
         self.assertEqual(cba_user["item_count"], 1)
         self.assertEqual(cba_user["score"], 300)
+
+    def test_items_by_ids(self):
+        """
+        Test that an ids lookup returns the requested items in the requested order,
+        and reports the ids that are not in the database
+        """
+        response = self.test_client.get("/hackernews/items?ids=3,1,123,3")
+        self.assertEquals(response.status_code, 200)
+        response_json = response.json()
+        self.assertEqual([i["id"] for i in response_json["items"]], [3, 1])
+        self.assertEqual(response_json["missing"], [123])
+        json = response_json["items"][1]
+        self.assertEquals(json["author"], "abc")
+        self.assertEquals(json["score"], 200)
+        self.assertEquals(json["time"], "2021-06-07T19:39:42Z")
+
+    def test_items_by_invalid_ids(self):
+        """
+        Test that an ids lookup returns 400 for malformed, empty or too many ids
+        """
+        for ids in ["1,a", "", ",".join(str(i) for i in range(6000))]:
+            response = self.test_client.get(f"/hackernews/items?ids={ids}")
+            self.assertEquals(response.status_code, 400)
+
+    def test_item_fields(self):
+        """
+        Test that item lookups only return the requested fields, whatever the lookup mode
+        """
+        for mode in ["", "&raw_sql=1", "&filter_in_memory=1"]:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.test_client.get(
+                    f"/hackernews/item/1?fields=score,id{mode}"
+                )
+            self.assertEquals(response.status_code, 200)
+            self.assertEquals(response.json(), {"id": 1, "score": 200})
+            # unrequested columns are not read from the database
+            self.assertFalse(any("title" in q["sql"] for q in queries.captured_queries))
+
+    def test_list_items_fields(self):
+        """
+        Test that item lists, paginated or by ids, only return the requested fields
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.test_client.get("/hackernews/items?fields=id,score&limit=2")
+        self.assertEquals(response.status_code, 200)
+        # unrequested columns are not read from the database
+        self.assertFalse(any("title" in q["sql"] for q in queries.captured_queries))
+        self.assertEquals(
+            response.json()["items"], [{"id": 1, "score": 200}, {"id": 2, "score": 300}]
+        )
+        response = self.test_client.get("/hackernews/items?ids=2,1&fields=title")
+        self.assertEquals(
+            response.json()["items"],
+            [{"title": "The coolest post"}, {"title": "A good post"}],
+        )
+
+    def test_invalid_fields(self):
+        """
+        Test that requesting unknown or no fields returns 400 on every item endpoint
+        """
+        for url in [
+            "/hackernews/item/1?fields=id,password",
+            "/hackernews/items?fields=",
+            "/hackernews/items?ids=1&fields=descendants",
+        ]:
+            response = self.test_client.get(url)
+            self.assertEquals(response.status_code, 400)
+
+
+class UserStatsViewTests(TestCase):
+    """
+    Test cases of the per-user lookup and the score leaderboard, which read
+    the user stats precomputed from the fixtures
+    """
+
+    fixtures = ["items.json"]
+    test_client = Client()
+
+    def setUp(self):
+        Item.objects.create(
+            id=5, author="xyz", score=300, time="2021-06-10T19:39:42Z", type="story"
+        )
+        call_command("rebuild_user_stats", stdout=StringIO())
+
+    def test_user_lookup(self):
+        """
+        Test that a user lookup returns the aggregated stats and rank of the user
+        """
+        response = self.test_client.get("/hackernews/users/abc")
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(
+            response.json(), {"name": "abc", "item_count": 3, "score": 450, "rank": 1}
+        )
+        response = self.test_client.get("/hackernews/users/xyz")
+        self.assertEquals(response.json()["rank"], 2)
+
+    def test_failed_user_lookup(self):
+        """
+        Test that a user lookup returns 404 if the user has no items
+        """
+        response = self.test_client.get("/hackernews/users/nobody")
+        self.assertEquals(response.status_code, 404)
+
+    def test_leaderboard(self):
+        """
+        Test that ordering users by score returns them ranked, sharing rank on ties,
+        across pages
+        """
+        response = self.test_client.get("/hackernews/users?order=-score&limit=2")
+        self.assertEquals(response.status_code, 200)
+        response_json = response.json()
+        users = response_json["users"]
+        self.assertEquals(response_json["next_page"], 2)
+        response = self.test_client.get("/hackernews/users?order=-score&limit=2&page=2")
+        users.extend(response.json()["users"])
+        self.assertEqual(
+            [(u["name"], u["score"], u["rank"]) for u in users],
+            [("abc", 450, 1), ("cba", 300, 2), ("xyz", 300, 2)],
+        )
+
+    def test_empty_leaderboard(self):
+        """
+        Test that listing users without a limit works when there are no users
+        """
+        UserStats.objects.all().delete()
+        for url in ["/hackernews/users", "/hackernews/users?order=-score"]:
+            response = self.test_client.get(url)
+            self.assertEquals(response.status_code, 200)
+            self.assertEquals(response.json()["users"], [])
+
+    def test_refresh_users(self):
+        """
+        Test that refreshing user stats recomputes them from the items, including users
+        without stats yet, and removes users without items
+        """
+        Item.objects.filter(author="cba").delete()
+        Item.objects.create(
+            id=6, author="new", score=5, time="2021-06-10T19:39:42Z", type="story"
+        )
+        UserStats.refresh(["cba", "new", "abc"])
+        self.assertEqual(
+            list(UserStats.objects.order_by("name").values_list("name", "score")),
+            [("abc", 450), ("new", 5), ("xyz", 300)],
+        )
+
+    def test_invalid_order(self):
+        """
+        Test that ordering users by an unsupported key returns 400
+        """
+        response = self.test_client.get("/hackernews/users?order=score")
+        self.assertEquals(response.status_code, 400)
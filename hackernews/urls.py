@@ -7,5 +7,6 @@ urlpatterns = [
     path("item/<int:item_id>", views.item, name="item"),
     path("items", views.items, name="items"),
     path("users", views.users, name="users"),
+    path("users/<str:name>", views.user, name="user"),
     path("load", load.load_items_from_hackernews, name="load"),
 ]
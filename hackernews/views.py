@@ -1,11 +1,27 @@
+from django.conf import settings
 from django.core.paginator import Paginator, EmptyPage
-from django.db.models import Count, F, Sum
 from django.forms import model_to_dict
 from django.http import HttpRequest
 from django.http.response import HttpResponseBase, JsonResponse
 from django.shortcuts import redirect
 
-from hackernews.models import Item
+from hackernews.load import fetch_items_from_hackernews
+from hackernews.models import ITEM_FIELDS, ColdItem, Item, UserStats
+
+ITEM_RESPONSE_FIELDS = ["id"] + ITEM_FIELDS
+
+
+def get_item_fields(request: HttpRequest):
+    """
+    Return the list of item fields requested with the optional `fields` query parameter
+    (comma separated field names, all fields by default), or None if any field is unknown.
+    """
+    if "fields" not in request.GET:
+        return ITEM_RESPONSE_FIELDS
+    fields = list(dict.fromkeys(f for f in request.GET["fields"].split(",") if f))
+    if not fields or any(f not in ITEM_RESPONSE_FIELDS for f in fields):
+        return None
+    return fields
 
 
 def index(request: HttpRequest) -> HttpResponseBase:
@@ -27,6 +43,10 @@ def item(request: HttpRequest, item_id: int) -> HttpResponseBase:
       "url": (str), URL of the item
       "type": (str), type of the item, generally a "story"
     }
+    If an `include_cold` query parameter is passed, items moved to the cold tier by
+    `compact_items` are looked up as well.
+    If a `fields` query parameter is passed, only those fields are read and returned,
+    and unknown fields return a 400.
     If there is no item with the passed in id, return a 404
 
     This method is implemented to illustrate different ways of accessing
@@ -36,24 +56,33 @@ def item(request: HttpRequest, item_id: int) -> HttpResponseBase:
     # Example of getting query parameter values:
     raw_sql = bool(request.GET.get("raw_sql", False))
     filter_in_memory = bool(request.GET.get("filter_in_memory", False))
+    include_cold = bool(request.GET.get("include_cold", False))
+    fields = get_item_fields(request)
+    if fields is None:
+        return JsonResponse(data={"message": "invalid fields."}, status=400)
 
     if not filter_in_memory and not raw_sql:
-        # Can use django QuerySet functionality to find the item by id in the database:
+        # Can use django QuerySet functionality to find the item by id in the database,
+        # only reading the requested columns:
         # ( https://docs.djangoproject.com/en/3.2/ref/models/querysets/ )
-        data_list = Item.objects.filter(id=item_id)
+        data_list = Item.objects.filter(id=item_id).only(*fields)
     elif not raw_sql:
-        # or load all items and filter in python
-        data_list = [i for i in Item.objects.all() if i.id == item_id]
+        # or load all items (only the requested columns) and filter in python
+        data_list = [i for i in Item.objects.only(*fields) if i.id == item_id]
     else:
-        # or use raw sql to do the same:
+        # or use raw sql to do the same (fields are validated, and raw queries need the id):
         data_list = Item.objects.raw(
-            "select id,author,time,score,title,url,type from hackernews_item where id = %s",
+            "select {0} from hackernews_item where id = %s".format(
+                ",".join(dict.fromkeys(["id"] + fields))
+            ),
             [item_id],
         )
     # Then can translate to a json response:
     data = data_list[0] if len(data_list) == 1 else None
+    if not data and include_cold:
+        data = ColdItem.objects.filter(id=item_id).only(*fields).first()
     if data:
-        json_data = model_to_dict(data)
+        json_data = model_to_dict(data, fields=fields)
         status = 200
     else:
         json_data = {"message": f"item {item_id} not found"}
@@ -63,7 +92,11 @@ def item(request: HttpRequest, item_id: int) -> HttpResponseBase:
 
 def items(request: HttpRequest) -> HttpResponseBase:
     """
-    Should accept optional `page` and `limit` query parameters to control pagination.
+    Should accept optional `page` and `limit` query parameters to control pagination,
+    an optional `fields` query parameter to return only some item fields, as in `item`,
+    and an optional `include_cold` query parameter to list items moved to the cold tier as well.
+    If an `ids` query parameter is passed (comma separated item ids), return only those
+    items instead, see `items_by_ids`.
     Return json representing a paginated list of all items in the database, with each item
     in the same format as `item`:
     {
@@ -79,6 +112,13 @@ def items(request: HttpRequest) -> HttpResponseBase:
       }]
     }
     """
+    if "ids" in request.GET:
+        return items_by_ids(request)
+
+    fields = get_item_fields(request)
+    if fields is None:
+        return JsonResponse(data={"message": "invalid fields."}, status=400)
+
     try:
         page = int(request.GET.get("page"))
     except TypeError:
@@ -89,9 +129,21 @@ def items(request: HttpRequest) -> HttpResponseBase:
     except TypeError:
         limit = None
 
-    items_list = Item.objects.order_by('id').all()
+    if request.GET.get("include_cold", False):
+        # Merge both tiers ordered by id (which must be selected to order the union),
+        # skipping cold copies of items reloaded into the hot tier.
+        columns = list(dict.fromkeys(["id"] + fields))
+        cold_items = ColdItem.objects.exclude(id__in=Item.objects.values("id"))
+        items_list = (
+            Item.objects.values(*columns)
+            .union(cold_items.values(*columns), all=True)
+            .order_by("id")
+        )
+    else:
+        items_list = Item.objects.order_by("id").values(*fields)
 
-    paginator = Paginator(items_list, limit if limit else items_list.count())
+    # Without a limit everything fits in one page, which must not be empty-sized.
+    paginator = Paginator(items_list, limit if limit else max(items_list.count(), 1))
 
     try:
         page = paginator.page(page if page else 1)
@@ -101,7 +153,62 @@ def items(request: HttpRequest) -> HttpResponseBase:
     return JsonResponse(
         data={
             "next_page": page.next_page_number() if page.has_next() else None,
-            "items": [model_to_dict(item) for item in page.object_list],
+            "items": [{f: item[f] for f in fields} for item in page.object_list],
+        },
+        status=200,
+    )
+
+
+def items_by_ids(request: HttpRequest) -> HttpResponseBase:
+    """
+    Accepts an `ids` query parameter with up to `HN_MAX_ITEMS_IDS` comma separated item ids,
+    an optional `include_cold` query parameter to look up items moved to the cold tier as well,
+    an optional `fields` query parameter to return only some item fields, as in `item`,
+    and an optional `fetch_missing` query parameter to fetch the ids that are not in the
+    database from the HackerNews API (saving them) before responding.
+    Return json with the requested items, in the order requested, in the following structure:
+    {
+      "items": [{...}], items in the same format as `item`
+      "missing": [(int)], requested ids that could not be found
+    }
+    """
+    include_cold = bool(request.GET.get("include_cold", False))
+    fetch_missing = bool(request.GET.get("fetch_missing", False))
+    fields = get_item_fields(request)
+    if fields is None:
+        return JsonResponse(data={"message": "invalid fields."}, status=400)
+
+    try:
+        items_ids = [int(i) for i in request.GET["ids"].split(",") if i.strip()]
+    except ValueError:
+        return JsonResponse(data={"message": "invalid ids."}, status=400)
+
+    # Remove duplicated ids keeping the requested order.
+    items_ids = list(dict.fromkeys(items_ids))
+    if not items_ids or len(items_ids) > settings.HN_MAX_ITEMS_IDS:
+        return JsonResponse(data={"message": "invalid ids."}, status=400)
+
+    # Single `IN` query (batched by django if the backend limits query parameters).
+    items_by_id = Item.objects.only(*fields).in_bulk(items_ids)
+
+    missing_ids = [i for i in items_ids if i not in items_by_id]
+    if include_cold and missing_ids:
+        items_by_id.update(ColdItem.objects.only(*fields).in_bulk(missing_ids))
+        missing_ids = [i for i in items_ids if i not in items_by_id]
+    if fetch_missing and missing_ids:
+        items_by_id.update(
+            (item.id, item) for item in fetch_items_from_hackernews(missing_ids)
+        )
+        missing_ids = [i for i in items_ids if i not in items_by_id]
+
+    return JsonResponse(
+        data={
+            "items": [
+                model_to_dict(items_by_id[i], fields=fields)
+                for i in items_ids
+                if i in items_by_id
+            ],
+            "missing": missing_ids,
         },
         status=200,
     )
@@ -109,7 +216,8 @@ def items(request: HttpRequest) -> HttpResponseBase:
 
 def users(request: HttpRequest) -> HttpResponseBase:
     """
-    Should accept optional `page` and `limit` query parameters to control pagination.
+    Should accept optional `page` and `limit` query parameters to control pagination,
+    and an optional `order` query parameter: `name` (default) or `-score`.
     Return json representing a paginated list of aggregated information about the users
     who authored items in the database, in the following structure:
     {
@@ -118,9 +226,14 @@ def users(request: HttpRequest) -> HttpResponseBase:
         "name": (str), username
         "item_count": (int), number of items authored by the user
         "score": (int), aggregate score (summed) of all items authored by the user
+        "rank": (int), rank of the user by score, only when ordering by `-score`
       }]
     }
     """
+    order = request.GET.get("order", "name")
+    if order not in ["name", "-score"]:
+        return JsonResponse(data={"message": "invalid order."}, status=400)
+
     try:
         page = int(request.GET.get("page"))
     except TypeError:
@@ -131,24 +244,64 @@ def users(request: HttpRequest) -> HttpResponseBase:
     except TypeError:
         limit = None
 
-    items_list = (
-        Item.objects.values(name=F("author"))
-        .annotate(item_count=Count("author"))
-        .annotate(score=Sum("score"))
-        .order_by('author')
-    )
+    # Served from the precomputed user stats, for both orderings.
+    items_list = UserStats.objects.order_by(
+        *(["-score", "name"] if order == "-score" else ["name"])
+    ).values("name", "item_count", "score")
 
-    paginator = Paginator(items_list, limit if limit else items_list.count())
+    # Without a limit everything fits in one page, which must not be empty-sized.
+    paginator = Paginator(items_list, limit if limit else max(items_list.count(), 1))
 
     try:
         page = paginator.page(page if page else 1)
     except EmptyPage:
         return JsonResponse(data={"message": "invalid page number"}, status=400)
 
+    users_list = [item for item in page.object_list]
+    if order == "-score" and users_list:
+        # Users are sorted by score, so only the first one of the page needs a rank query,
+        # the following ones rank by position unless tied with the previous user.
+        users_list[0]["rank"] = (
+            UserStats.objects.filter(score__gt=users_list[0]["score"]).count() + 1
+        )
+        for position in range(1, len(users_list)):
+            user_data, previous = users_list[position], users_list[position - 1]
+            if user_data["score"] == previous["score"]:
+                user_data["rank"] = previous["rank"]
+            else:
+                user_data["rank"] = page.start_index() + position
+
     return JsonResponse(
         data={
             "next_page": page.next_page_number() if page.has_next() else None,
-            "users": [item for item in page.object_list],
+            "users": users_list,
+        },
+        status=200,
+    )
+
+
+def user(request: HttpRequest, name: str) -> HttpResponseBase:
+    """
+    Return json representing the aggregated information about the user with passed in name
+    in the following structure:
+    {
+      "name": (str), username
+      "item_count": (int), number of items authored by the user
+      "score": (int), aggregate score (summed) of all items authored by the user
+      "rank": (int), rank of the user by score (users with the same score share rank)
+    }
+    If there is no user with the passed in name, return a 404
+    """
+    user_stats = UserStats.objects.filter(name=name).first()
+    if not user_stats:
+        return JsonResponse(data={"message": f"user {name} not found"}, status=404)
+
+    return JsonResponse(
+        data={
+            "name": user_stats.name,
+            "item_count": user_stats.item_count,
+            "score": user_stats.score,
+            "rank": user_stats.rank,
         },
         status=200,
     )
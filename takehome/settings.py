@@ -133,3 +133,22 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # HackerNews main URL.
 
 HN_API_URL = "https://hacker-news.firebaseio.com/v0/"
+
+# Timeout in seconds of every request to the HackerNews API.
+
+HN_API_TIMEOUT = 10
+
+# Maximum number of ids accepted by a single `/hackernews/items?ids=...` request.
+
+HN_MAX_ITEMS_IDS = 5000
+
+# Directory where raw HackerNews payloads are archived on load (disabled if None),
+# and size in bytes after which a new archive segment is started.
+
+HN_ARCHIVE_DIR = None
+HN_ARCHIVE_SEGMENT_SIZE = 64 * 1024 * 1024
+
+# Items older than this many days are moved to the cold tier by `compact_items`
+# (no retention policy if None).
+
+HN_ITEMS_RETENTION_DAYS = None